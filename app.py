@@ -11,33 +11,44 @@ except Exception:
     pass
 
 import httpx
+from aiolimiter import AsyncLimiter
 from typing import List, Dict, Any
 
-import os, time, asyncio, re
+import time, asyncio, re, json, tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import lru_cache
-from io import StringIO
+from io import BytesIO
+from lxml import etree
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import feedparser
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
 
 from fastapi import FastAPI, Request, Query, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from sqlalchemy import create_engine, text
 
 # ----- FastAPI + templates/static -----
-app = FastAPI()
-os.makedirs("templates", exist_ok=True)
-os.makedirs("static", exist_ok=True)
+# orjson serializes the dict payloads returned by the /api routes in C
+app = FastAPI(default_response_class=ORJSONResponse)
+for d in ("templates", "static", ".cache/jinja"):
+    Path(d).mkdir(parents=True, exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
-env = Environment(loader=FileSystemLoader("templates"), auto_reload=True)
-templates = Jinja2Templates(directory="templates")
+# In prod, skip the per-render template mtime check and keep compiled templates cached
+IS_PROD = os.getenv("ENV") == "prod"
+# Compiled templates persist across restarts; stale entries are detected by source checksum
+env = Environment(loader=FileSystemLoader("templates"), auto_reload=not IS_PROD, cache_size=400,
+                  bytecode_cache=FileSystemBytecodeCache(".cache/jinja"))
+templates = Jinja2Templates(env=env)
 
 # ==================== Page routes ====================
 @app.get("/", response_class=HTMLResponse)
@@ -60,77 +71,228 @@ def commodities(request: Request):
 def ping():
     return {"ok": True}
 
+# ----- Shared HTTP sessions (keep-alive + connection pooling) -----
+def _pooled_session(headers: dict[str, str]) -> requests.Session:
+    s = requests.Session()
+    s.headers.update(headers)
+    s.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                                    max_retries=Retry(total=2, backoff_factor=0.2)))
+    return s
+
+# ----- Upstream payload caches -----
+class TTLCache:
+    """TTL cache with single-flight refresh and stale-while-revalidate.
+
+    Fresh payloads are returned as-is. A stale payload is returned immediately while
+    one background task refreshes it; a cold cache makes every caller wait on the
+    same refresh instead of each hitting the upstream.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.payload = None
+        self.ts = 0.0
+        self.lock = asyncio.Lock()
+        self.refreshing = False
+        self._task: asyncio.Task | None = None
+        # Validators of the upstream response behind `payload`, for conditional GETs
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+
+    def fresh(self) -> bool:
+        return self.payload is not None and time.time() - self.ts < self.ttl
+
+    def set(self, payload, ts: float | None = None):
+        self.payload = payload
+        self.ts = time.time() if ts is None else ts
+
+    def validators(self) -> dict[str, str]:
+        if self.payload is None:
+            return {}
+        h = {}
+        if self.etag: h["If-None-Match"] = self.etag
+        if self.last_modified: h["If-Modified-Since"] = self.last_modified
+        return h
+
+    def remember_validators(self, headers) -> None:
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+
+    async def refresh(self, fetch):
+        async with self.lock:
+            self.set(await fetch())
+        return self.payload
+
+    async def _refresh_in_background(self, fetch):
+        try:
+            async with self.lock:
+                # Skip if a refresh already in flight (e.g. at startup) renewed the payload
+                if not self.fresh():
+                    self.set(await fetch())
+        except Exception as e:
+            print("Background cache refresh failed:", repr(e))
+        finally:
+            self.refreshing = False
+
+    async def get(self, fetch):
+        if self.fresh():
+            return self.payload
+        if self.payload is not None:
+            if not self.refreshing:
+                self.refreshing = True
+                self._task = asyncio.create_task(self._refresh_in_background(fetch))
+            return self.payload
+        async with self.lock:
+            if self.payload is None:
+                self.set(await fetch())
+        return self.payload
+
+# ----- Minimal RSS/Atom parsing -----
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+def _atom_href(entry) -> str | None:
+    for ln in entry.iter(f"{ATOM_NS}link"):
+        if ln.get("rel", "alternate") == "alternate":
+            return ln.get("href")
+    return None
+
+def _text(el, tag: str) -> str | None:
+    t = el.findtext(tag)
+    return t.strip() if t is not None else None
+
+def _parse_feed_minimal(xml_bytes: bytes) -> list[dict]:
+    """Single lxml iterparse pass over an Atom or RSS 2.0 feed.
+
+    Only <entry>/<item> end events are surfaced, and each is freed once read.
+    Entries use the same keys as feedparser ("title", "link", "updated"/"published",
+    "tags"), so feedparser remains a drop-in fallback for feeds lxml rejects.
+    """
+    entries = []
+    try:
+        for _, el in etree.iterparse(BytesIO(xml_bytes), events=("end",),
+                                     tag=(f"{ATOM_NS}entry", "item"),
+                                     resolve_entities=False, no_network=True):
+            if el.tag == f"{ATOM_NS}entry":
+                entries.append({
+                    "title": _text(el, f"{ATOM_NS}title"),
+                    "link": _atom_href(el),
+                    "updated": _text(el, f"{ATOM_NS}updated"),
+                    "tags": [{"term": c.get("term")} for c in el.iter(f"{ATOM_NS}category")],
+                })
+            else:
+                entries.append({
+                    "title": _text(el, "title"),
+                    "link": _text(el, "link"),
+                    "published": _text(el, "pubDate"),
+                    "tags": [{"term": c.text} for c in el.iter("category")],
+                })
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+    except etree.XMLSyntaxError:
+        return feedparser.parse(xml_bytes).entries
+    return entries
+
 # ---------- Home: Major Headlines (CNBC only) ----------
-HOME_NEWS_CACHE = {"ts": 0, "payload": None}
 HOME_NEWS_TTL = 300
+HOME_NEWS_CACHE = TTLCache(HOME_NEWS_TTL)
+NEWS_HEADERS = {"User-Agent": "FountainAI/1.0 (+contact admin@fountain-ai.com)"}
+# HTTP/2 multiplexes the per-symbol Yahoo requests over one connection
+NEWS_CLIENT = httpx.AsyncClient(headers=NEWS_HEADERS, timeout=10, http2=True,
+                                limits=httpx.Limits(max_connections=16))
 
-@app.get("/api/home/major")
-def home_major(limit: int = 20):
-    now = time.time()
-    if HOME_NEWS_CACHE["payload"] and now - HOME_NEWS_CACHE["ts"] < HOME_NEWS_TTL:
-        return HOME_NEWS_CACHE["payload"]
-
+async def _fetch_home_news(limit: int) -> dict:
     FEED_URL = "https://www.cnbc.com/id/100003114/device/rss/rss.html"
-    headers = {"User-Agent": "FountainAI/1.0 (+contact admin@fountain-ai.com)"}
     try:
-        r = requests.get(FEED_URL, headers=headers, timeout=10)
+        r = await NEWS_CLIENT.get(FEED_URL, headers=HOME_NEWS_CACHE.validators())
+        if r.status_code == 304:
+            return HOME_NEWS_CACHE.payload
         r.raise_for_status()
-        feed = feedparser.parse(r.content)
+        entries = _parse_feed_minimal(r.content)
+        HOME_NEWS_CACHE.remember_validators(r.headers)
     except Exception as e:
         print("CNBC fetch error:", repr(e))
-        payload = {"count": 0, "articles": []}
-        HOME_NEWS_CACHE.update(ts=now, payload=payload)
-        return payload
+        HOME_NEWS_CACHE.remember_validators({})
+        return {"count": 0, "articles": []}
 
     arts = []
-    for e in (feed.entries or [])[:limit]:
+    for e in entries[:limit]:
         t, link = (e.get("title") or "").strip(), (e.get("link") or "").strip()
         if t and link:
             arts.append({"title": t, "url": link, "source": "CNBC",
                          "published_at": e.get("published") or e.get("updated")})
-    payload = {"count": len(arts), "articles": arts}
-    HOME_NEWS_CACHE.update(ts=now, payload=payload)
-    return payload
+    return {"count": len(arts), "articles": arts}
+
+@app.get("/api/home/major")
+async def home_major(limit: int = 20):
+    return await HOME_NEWS_CACHE.get(lambda: _fetch_home_news(limit))
 
 # ========= SEC (Home feed + per-ticker browse) ======================
 SEC_HEADERS = {
     "User-Agent": "FountainAI/1.0 (fountain-ai.com) Contact: admin@fountain-ai.com",
     "Accept": "application/json, text/xml, application/atom+xml;q=0.9,*/*;q=0.8",
 }
+SEC_SESSION = _pooled_session(SEC_HEADERS)
+SEC_CLIENT = httpx.AsyncClient(headers=SEC_HEADERS, timeout=15,
+                               limits=httpx.Limits(max_connections=16))
+SEC_CONCURRENCY = 4  # per-request cap on in-flight tickers
+SEC_LIMITER = AsyncLimiter(10, 1)  # SEC fair-access guidance: <= 10 requests/second
+
+_WS_RE = re.compile(r"\s+")
+_ACC_RE = re.compile(r"/data/\d+/(\d{10,})/")
+_ACC_ANY_RE = re.compile(r"(\d{10,})")
+_FORM_RE = re.compile(r"\b(10-K|10-Q|8-K)\b", re.I)
+ALLOWED_FORMS = frozenset({"10-K", "10-Q", "8-K"})
+
+def _tag_form(ent, allowed) -> str | None:
+    """First category term (upper-cased) that is in `allowed`, else None."""
+    return next((t for c in (ent.get("tags") or ent.get("categories") or ())
+                 if (t := (c.get("term") or "").upper()) in allowed), None)
+
+SEC_PAGE_MAX_BYTES = 256_000  # getcurrent HTML pages are < 200KB
+
+async def _get_capped(client: httpx.AsyncClient, url: str, max_bytes: int) -> bytes:
+    """Stream a response body, stopping once max_bytes have been read."""
+    buf = bytearray()
+    async with client.stream("GET", url) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            buf += chunk
+            if len(buf) >= max_bytes:
+                break
+    return bytes(buf[:max_bytes])
+
+def _row_cells(tr) -> list:
+    """Direct <td> children of a row (no descent into nested markup)."""
+    return [c for c in tr.iter() if c.tag == "td"]
 
 def _clean(s: str | None) -> str:
-    return re.sub(r"\s+", " ", s or "").strip()
+    return _WS_RE.sub(" ", s or "").strip()
 
 # ---------- Home: recent SEC filings ----------
-HOME_SEC_CACHE = {"ts": 0, "payload": None}
 HOME_SEC_TTL = 300
+HOME_SEC_CACHE = TTLCache(HOME_SEC_TTL)
 
-@app.get("/api/home/sec-recent")
-def sec_recent(forms: str = "10-K,10-Q,8-K", count: int = 50):
-    now = time.time()
-    if HOME_SEC_CACHE["payload"] and now - HOME_SEC_CACHE["ts"] < HOME_SEC_TTL:
-        return HOME_SEC_CACHE["payload"]
-
+async def _fetch_sec_recent(forms: str, count: int) -> dict:
     wants = {f.strip().upper() for f in forms.split(",") if f.strip()}
     filings: list[dict] = []
 
-    # 1) Atom feed (current filings)
+    # 1) Atom feed (current filings); an unchanged feed (304) keeps the cached payload
     try:
         atom_count = min(max(int(count), 1), 200)
         url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&count={atom_count}&output=atom"
-        r = requests.get(url, headers=SEC_HEADERS, timeout=15); r.raise_for_status()
-        parsed = feedparser.parse(r.content)
-        for ent in parsed.entries or []:
+        async with SEC_LIMITER:
+            r = await SEC_CLIENT.get(url, headers=HOME_SEC_CACHE.validators())
+        if r.status_code == 304:
+            return HOME_SEC_CACHE.payload
+        r.raise_for_status()
+        HOME_SEC_CACHE.remember_validators(r.headers)
+        for ent in _parse_feed_minimal(r.content):
             title = _clean(ent.get("title"))
             link = ent.get("link")
             updated = ent.get("updated") or ent.get("published")
-            atom_form = None
-            for c in (ent.get("tags") or ent.get("categories") or []):
-                term = (c.get("term") or "").upper()
-                if term in wants:
-                    atom_form = term; break
+            atom_form = _tag_form(ent, wants)
             if not atom_form:
-                m = re.search(r"\b(10-K|10-Q|8-K)\b", title, re.I)
+                m = _FORM_RE.search(title)
                 if m: atom_form = m.group(1).upper()
             if not atom_form or (wants and atom_form not in wants):
                 continue
@@ -146,6 +308,7 @@ def sec_recent(forms: str = "10-K,10-Q,8-K", count: int = 50):
                 break
     except Exception as e:
         print("SEC Atom error:", repr(e))
+        HOME_SEC_CACHE.remember_validators({})
 
     # 2) Fallback HTML pages (40 rows/page)
     if len(filings) < count:
@@ -153,22 +316,25 @@ def sec_recent(forms: str = "10-K,10-Q,8-K", count: int = 50):
             remaining = count - len(filings)
             for start in range(0, min(200, remaining + 40), 40):
                 url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&start={start}&count=40"
-                rr = requests.get(url, headers=SEC_HEADERS, timeout=15); rr.raise_for_status()
-                soup = BeautifulSoup(rr.text, "html.parser")
-                rows = soup.select("table tr")[1:]
+                async with SEC_LIMITER:
+                    html = await _get_capped(SEC_CLIENT, url, SEC_PAGE_MAX_BYTES)
+                rows = LexborHTMLParser(html).css("table tr")[1:]
                 for tr in rows:
-                    tds = tr.find_all("td")
+                    tds = _row_cells(tr)
                     if len(tds) < 3:
                         continue
-                    form = _clean(tds[0].get_text()).upper()
+                    form = _clean(tds[0].text()).upper()
                     if wants and form not in wants:
                         continue
-                    comp_a = tds[2].find("a")
-                    company = _clean(comp_a.text) if comp_a else _clean(tds[2].get_text())
-                    link_a = tds[2].find("a", href=True)
-                    link = (f"https://www.sec.gov{link_a['href']}"
-                            if link_a and not link_a["href"].startswith("http") else (link_a["href"] if link_a else None))
-                    filed_at = _clean(tds[5].get_text()) if len(tds) >= 6 else None
+                    comp_a = tds[2].css_first("a")
+                    company = _clean(comp_a.text()) if comp_a else _clean(tds[2].text())
+                    href = comp_a.attributes.get("href") if comp_a else None
+                    if comp_a and href is None:
+                        link_a = tds[2].css_first("a[href]")
+                        href = link_a.attributes.get("href") if link_a else None
+                    link = (f"https://www.sec.gov{href}"
+                            if href and not href.startswith("http") else href)
+                    filed_at = _clean(tds[5].text()) if len(tds) >= 6 else None
                     filings.append({
                         "company": company,
                         "form": form,
@@ -183,28 +349,29 @@ def sec_recent(forms: str = "10-K,10-Q,8-K", count: int = 50):
         except Exception as e:
             print("SEC HTML scrape error:", repr(e))
 
-    payload = {"count": len(filings), "filings": filings[:count]}
-    HOME_SEC_CACHE.update(ts=now, payload=payload)
-    return payload
+    return {"count": len(filings), "filings": filings[:count]}
+
+@app.get("/api/home/sec-recent")
+async def sec_recent(forms: str = "10-K,10-Q,8-K", count: int = 50):
+    return await HOME_SEC_CACHE.get(lambda: _fetch_sec_recent(forms, count))
 
 # --- Enrich filings with per-row descriptions from the company browse page (HTML) ---
-DESC_CACHE = {}   # key: cik_int -> {"ts":..., "map": {...}}
+DESC_CACHE: dict[int, TTLCache] = {}   # key: cik_int -> cached {accession: description}
 DESC_TTL = 300
 
 def _acc_from_link(url: str) -> str | None:
-    m = re.search(r"/data/\d+/(\d{10,})/", url or "")
+    m = _ACC_RE.search(url or "")
     if m:
         return m.group(1)
-    m = re.findall(r"(\d{10,})", url or "")
+    m = _ACC_ANY_RE.findall(url or "")
     return max(m, key=len) if m else None
 
-def _company_browse_descriptions(cik_num: int, count: int = 200) -> dict[str, str]:
+async def _company_browse_descriptions(cik_num: int, count: int = 200) -> dict[str, str]:
     """Scrape the 'getcompany' HTML table; return {accession_no_dashes: description}."""
-    now = time.time()
-    cached = DESC_CACHE.get(cik_num)
-    if cached and now - cached["ts"] < DESC_TTL:
-        return cached["map"]
+    cache = DESC_CACHE.setdefault(cik_num, TTLCache(DESC_TTL))
+    return await cache.get(lambda: _fetch_browse_descriptions(cik_num, count))
 
+async def _fetch_browse_descriptions(cik_num: int, count: int) -> dict[str, str]:
     url = "https://www.sec.gov/cgi-bin/browse-edgar"
     params = {
         "action": "getcompany",
@@ -214,19 +381,20 @@ def _company_browse_descriptions(cik_num: int, count: int = 200) -> dict[str, st
     }
     desc_map: dict[str, str] = {}
     try:
-        rr = requests.get(url, headers=SEC_HEADERS, params=params, timeout=15)
+        async with SEC_LIMITER:
+            rr = await SEC_CLIENT.get(url, params=params)
         rr.raise_for_status()
-        soup = BeautifulSoup(rr.text, "html.parser")
-        rows = soup.select("table.tableFile2 tr")[1:] or soup.select("table tr")[1:]
+        tree = LexborHTMLParser(rr.content)
+        rows = tree.css("table.tableFile2 tr")[1:] or tree.css("table tr")[1:]
         for tr in rows:
-            tds = tr.find_all("td")
+            tds = _row_cells(tr)
             if len(tds) < 3:
                 continue
-            docs_a = tds[1].find("a", href=True) if len(tds) > 1 else None
-            desc_txt = _clean(tds[2].get_text())
+            docs_a = tds[1].css_first("a[href]")
             if not docs_a:
                 continue
-            href = docs_a["href"]
+            desc_txt = _clean(tds[2].text())
+            href = docs_a.attributes.get("href")
             if href and not href.startswith("http"):
                 href = f"https://www.sec.gov{href}"
             acc = _acc_from_link(href)
@@ -235,19 +403,43 @@ def _company_browse_descriptions(cik_num: int, count: int = 200) -> dict[str, st
     except Exception as e:
         print("company browse description scrape error:", repr(e))
 
-    DESC_CACHE[cik_num] = {"ts": now, "map": desc_map}
     return desc_map
 
 # --- Per-ticker Atom feed + join with descriptions (used by /portfolio) ---
+CACHE_DIR = Path(".cache")
+TICKER_MAP_PATH = CACHE_DIR / "company_tickers.json"
+TICKER_MAP_TTL = 86400
+
+def _write_cache_file(path: Path, data: bytes):
+    """Write via a temp file + os.replace so readers in other workers never see a partial file."""
+    CACHE_DIR.mkdir(exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
 @lru_cache(maxsize=1)
 def _ticker_map() -> dict[str, int]:
-    url = "https://www.sec.gov/files/company_tickers.json"
-    r = requests.get(url, headers=SEC_HEADERS, timeout=15)
-    r.raise_for_status()
-    data = r.json()
+    # Disk copy survives restarts/reloads and is shared by all workers; refreshed daily.
+    data = None
+    if TICKER_MAP_PATH.exists() and time.time() - TICKER_MAP_PATH.stat().st_mtime < TICKER_MAP_TTL:
+        try:
+            data = json.loads(TICKER_MAP_PATH.read_bytes())
+        except ValueError as e:
+            print("ticker map cache unreadable, refetching:", repr(e))
+    if data is None:
+        url = "https://www.sec.gov/files/company_tickers.json"
+        r = SEC_SESSION.get(url, timeout=15)
+        r.raise_for_status()
+        data = r.json()
+        _write_cache_file(TICKER_MAP_PATH, r.content)
     return {row["ticker"].upper(): int(row["cik_str"]) for _, row in data.items()}
 
-def _sec_company_atom(cik_num: int, count: int = 200):
+async def _sec_company_atom(cik_num: int, count: int = 200):
     """Company filings Atom feed (same source as SEC company page)."""
     url = "https://www.sec.gov/cgi-bin/browse-edgar"
     params = {
@@ -257,9 +449,10 @@ def _sec_company_atom(cik_num: int, count: int = 200):
         "count": str(min(max(20, count), 400)),
         "output": "atom",
     }
-    r = requests.get(url, headers=SEC_HEADERS, params=params, timeout=15)
+    async with SEC_LIMITER:
+        r = await SEC_CLIENT.get(url, params=params)
     r.raise_for_status()
-    return feedparser.parse(r.content)
+    return _parse_feed_minimal(r.content)
 
 def _parse_atom_entries(entries, wants: set[str], company_fallback: str):
     out = []
@@ -268,13 +461,9 @@ def _parse_atom_entries(entries, wants: set[str], company_fallback: str):
         link  = ent.get("link")
         when  = ent.get("updated") or ent.get("published")
         # Prefer explicit tags; fallback to title
-        form = None
-        for c in (ent.get("tags") or ent.get("categories") or []):
-            term = (c.get("term") or "").upper()
-            if term in {"10-K","10-Q","8-K"}:
-                form = term; break
+        form = _tag_form(ent, ALLOWED_FORMS)
         if not form:
-            m = re.search(r"\b(10-K|10-Q|8-K)\b", title, re.I)
+            m = _FORM_RE.search(title)
             if m: form = m.group(1).upper()
         if not form or (wants and form not in wants):
             continue
@@ -288,53 +477,54 @@ def _parse_atom_entries(entries, wants: set[str], company_fallback: str):
         })
     return out
 
+def _sort_newest_first(rows: list[dict]) -> list[dict]:
+    """Order rows by filed_at (newest first, unparseable last) with one vectorized parse."""
+    if len(rows) < 2:
+        return rows
+    ts = pd.to_datetime([r.get("filed_at") for r in rows], errors="coerce", utc=True, cache=True)
+    keys = np.where(ts.isna(), np.iinfo(np.int64).min + 1, ts.asi8)
+    return [rows[i] for i in np.argsort(-keys, kind="stable")]
+
 @app.get("/api/sec/filings-browse-for")
-def sec_filings_browse_batch(
+async def sec_filings_browse_batch(
     tickers: str = Query(..., description="comma-separated tickers"),
     forms: str = "10-K,10-Q,8-K",
     count_per: int = 200
 ):
     """
-    For each ticker:
+    For each ticker (fetched concurrently, at most SEC_CONCURRENCY at a time):
       1) Pull company Atom feed -> form/date/url
       2) Scrape company browse HTML once -> accession -> short description
       3) Join by accession extracted from the Atom link (adds 'desc')
     """
     wants = {w.strip().upper() for w in forms.split(",") if w.strip()}
-    mp = _ticker_map()
+    mp = await asyncio.to_thread(_ticker_map)
     ticks = [t.strip().upper() for t in tickers.split(",") if t.strip()]
-    by_ticker: dict[str, list[dict]] = {}
+    sem = asyncio.Semaphore(SEC_CONCURRENCY)
 
-    for t in ticks:
+    async def one(t: str) -> list[dict]:
         cik = mp.get(t)
         if not cik:
-            by_ticker[t] = []
-            continue
+            return []
 
-        try:
-            feed = _sec_company_atom(cik_num=cik, count=count_per)
-            rows = _parse_atom_entries(feed.entries, wants, company_fallback=t)
-            desc_map = _company_browse_descriptions(cik, count=count_per)
-
-            for r in rows:
-                acc = _acc_from_link(r.get("url") or "")
-                if acc and acc in desc_map:
-                    r["desc"] = desc_map[acc]
-        except Exception as e:
-            print(f"[SEC browse] {t} failed:", repr(e))
-            rows = []
-
-        def _datekey(x):
+        async with sem:
             try:
-                return pd.to_datetime(x.get("filed_at")).to_pydatetime()
-            except Exception:
-                return datetime.min
-        rows.sort(key=_datekey, reverse=True)
-        by_ticker[t] = rows
+                entries = await _sec_company_atom(cik_num=cik, count=count_per)
+                rows = _parse_atom_entries(entries, wants, company_fallback=t)
+                desc_map = await _company_browse_descriptions(cik, count=count_per)
+
+                for r in rows:
+                    acc = _acc_from_link(r.get("url") or "")
+                    if acc and acc in desc_map:
+                        r["desc"] = desc_map[acc]
+            except Exception as e:
+                print(f"[SEC browse] {t} failed:", repr(e))
+                rows = []
 
-        time.sleep(0.25)  # tiny politeness pause
+        return _sort_newest_first(rows)
 
-    return {"by_ticker": by_ticker}
+    results = await asyncio.gather(*(one(t) for t in ticks))
+    return {"by_ticker": dict(zip(ticks, results))}
 
 #====================Sector Stock Prices
 
@@ -342,14 +532,17 @@ def sec_filings_browse_batch(
 WEEK_SECONDS = 7 * 24 * 60 * 60
 
 HEADERS = {"User-Agent": "Mozilla/5.0"}
-CACHE = {"congress": None, "ts": 0}
+QUIVER_SESSION = _pooled_session(HEADERS)
+QUIVER_POOL = ThreadPoolExecutor(max_workers=2)   # Senate + House pages fetched side by side
+SENATE_URL = "https://www.quiverquant.com/sources/senatetrading"
+HOUSE_URL = "https://www.quiverquant.com/sources/housetrading"
 CACHE_TTL = 300
+CACHE = TTLCache(CACHE_TTL)
+CONGRESS_CACHE_PATH = CACHE_DIR / "congress.json"
 
 CONGRESS_LAWS_CACHE = {"laws": None, "ts": 0}
 CONGRESS_LAWS_TTL = 86400  # 24 hours
 
-from datetime import datetime
-
 """Calculate current Congress number based on the year."""
 def get_current_congress() -> int:
     # 119th Congress started in January 2025
@@ -420,9 +613,11 @@ async def fetch_enacted_laws_api(congress: int = None, limit: int = 50) -> List[
 # Modify your existing schedule_weekly_refresh function:
 @app.on_event("startup")
 async def schedule_weekly_refresh():
+    _load_congress_cache_from_disk()
+
     async def loop_refresh():
         # Initial refresh for congress trades
-        try: _refresh_congress_cache()
+        try: await _refresh_congress_cache()
         except Exception as e: print("Initial congress trades refresh failed:", repr(e))
         
         # Initial refresh for enacted laws
@@ -437,7 +632,7 @@ async def schedule_weekly_refresh():
             
             # Refresh congress trades
             try: 
-                _refresh_congress_cache()
+                await _refresh_congress_cache()
                 print("Weekly congress trades refresh completed")
             except Exception as e: 
                 print("Weekly congress trades refresh failed:", repr(e))
@@ -459,64 +654,111 @@ async def schedule_weekly_refresh():
     
     asyncio.create_task(loop_refresh())
 
+@app.on_event("shutdown")
+async def close_http_clients():
+    await SEC_CLIENT.aclose()
+    await NEWS_CLIENT.aclose()
+    QUIVER_POOL.shutdown(wait=False)
+
 def _get_table(url: str) -> pd.DataFrame:
-    r = requests.get(url, headers=HEADERS, timeout=20); r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser"); table = soup.find("table")
+    """Parse the first <table> on the page in one pass (no read_html re-parse)."""
+    r = QUIVER_SESSION.get(url, timeout=20); r.raise_for_status()
+    table = LexborHTMLParser(r.content).css_first("table")
     if table is None: raise RuntimeError("No table found on page")
-    return pd.read_html(str(table))[0]
+    header_cells = table.css("thead th") or table.css("tr")[0].css("th")
+    headers = [_clean(th.text()) or f"Unnamed: {i}" for i, th in enumerate(header_cells)]
+    width = len(headers)
+    body = table.css("tbody tr") or table.css("tr")[1:]
+    rows = []
+    for tr in body:
+        cells = [_clean(td.text()) or None for td in tr.css("td")]
+        if cells:
+            rows.append((cells + [None] * width)[:width])
+    return pd.DataFrame.from_records(rows, columns=headers)
+
+def _parse_dates(s: pd.Series) -> pd.Series:
+    # Fast fixed-format path; only rows it rejects pay for per-row format inference
+    d = pd.to_datetime(s, format="%Y-%m-%d", errors="coerce", cache=True)
+    miss = d.isna() & s.notna()
+    if miss.any():
+        d[miss] = pd.to_datetime(s[miss], format="mixed", errors="coerce", cache=True)
+    return d
 
 def _load_congress_trades() -> pd.DataFrame:
-    senate = _get_table("https://www.quiverquant.com/sources/senatetrading")
-    house  = _get_table("https://www.quiverquant.com/sources/housetrading")
+    senate_fut = QUIVER_POOL.submit(_get_table, SENATE_URL)
+    house_fut  = QUIVER_POOL.submit(_get_table, HOUSE_URL)
+    senate, house = senate_fut.result(), house_fut.result()
     senate["Chamber"] = "Senate"; house["Chamber"]  = "House"
     df = pd.concat([senate, house], ignore_index=True)
     df.columns = [c.strip() for c in df.columns]
     if "Unnamed: 6" in df.columns:
         df = df.rename(columns={"Unnamed: 6": "Price Change %"})
-    def trans_type(s): return s.split(" ")[0] if isinstance(s, str) else None
-    def low_amt(s):
-        try: a = s.split("$",1)[-1].split(" - ")[0]; return int(a.replace(",",""))
-        except: return None
-    def high_amt(s):
-        try: a = s.split("$",1)[-1].split(" - ")[1].replace("$",""); return int(a.replace(",",""))
-        except: return None
-    df["Trans Type"] = df["Transaction"].apply(trans_type)
-    df["Low Range"]  = df["Transaction"].apply(low_amt)
-    df["High Range"] = df["Transaction"].apply(high_amt)
-    df["Est. Trade Value"] = df[["Low Range","High Range"]].mean(axis=1)
-    df["Filed"]  = pd.to_datetime(df["Filed"],  errors="coerce")
-    df["Traded"] = pd.to_datetime(df["Traded"], errors="coerce")
-    df["Signed Value"] = df.apply(
-        lambda r: r["Est. Trade Value"] if r["Trans Type"] == "Purchase"
-        else (-r["Est. Trade Value"] if r["Trans Type"] == "Sale" else 0),
-        axis=1)
+    ext = df["Transaction"].str.extract(r"^(?P<tt>\S+)(?:.*?\$(?P<lo>[\d,]+)(?:\s*-\s*\$?(?P<hi>[\d,]+))?)?")
+    df["Trans Type"] = ext["tt"]
+    df["Low Range"]  = pd.to_numeric(ext["lo"].str.replace(",", "", regex=False), errors="coerce")
+    df["High Range"] = pd.to_numeric(ext["hi"].str.replace(",", "", regex=False), errors="coerce")
+    lo = df["Low Range"].to_numpy(dtype="float64")
+    hi = df["High Range"].to_numpy(dtype="float64")
+    # Midpoint of the bracket; open-ended "Over $X" rows carry only one bound
+    v = np.where(np.isnan(hi), lo, np.where(np.isnan(lo), hi, (lo + hi) * 0.5))
+    df["Est. Trade Value"] = v
+    df["Filed"]  = _parse_dates(df["Filed"])
+    df["Traded"] = _parse_dates(df["Traded"])
+    tt = df["Trans Type"].to_numpy()
+    df["Signed Value"] = np.where(tt == "Purchase", v, np.where(tt == "Sale", -v, 0.0))
+    for col in ("Stock", "Chamber", "Trans Type"):
+        df[col] = df[col].astype("category")
     return df
 
+def _top_n(keys: np.ndarray, labels: np.ndarray, n: int, sign: float = 1.0) -> pd.Series:
+    """Largest n of `keys` (ties in first-seen order) without sorting the whole array."""
+    idx = np.arange(len(keys))
+    if len(keys) > n:
+        # Everything >= the n-th largest key, so ties at the cut keep first-seen order
+        idx = np.flatnonzero(keys >= np.partition(keys, len(keys) - n)[len(keys) - n])
+    idx = idx[np.lexsort((idx, -keys[idx]))][:n]
+    return pd.Series(sign * keys[idx], index=labels[idx])
+
 def _compute_top_bottom(df: pd.DataFrame, n=10):
     df = df.dropna(subset=["Filed","Signed Value","Stock"])
-    net = df.groupby("Stock")["Signed Value"].sum().sort_values()
-    bottom = net.head(n); top = net[::-1].head(n)
+    codes, uniques = pd.factorize(df["Stock"])
+    uniques = np.asarray(uniques)
+    sums = np.bincount(codes, weights=df["Signed Value"].to_numpy(dtype="float64"), minlength=len(uniques))
+    top, bottom = _top_n(sums, uniques, n), _top_n(-sums, uniques, n, sign=-1.0)
     start, end = df["Filed"].min(), df["Filed"].max()
     date_range = f"{start:%b %d, %Y} to {end:%b %d, %Y}" if pd.notnull(start) and pd.notnull(end) else "N/A"
-    to_list = lambda s: [{"stock": k, "value": float(v)} for k,v in s.items()]
+    to_list = lambda s: [{"stock": str(k), "value": float(v)}
+                         for k, v in zip(s.index.to_numpy(), s.to_numpy(dtype="float64"))]
     return {"date_range": date_range, "top10": to_list(top), "bottom10": to_list(bottom)}
 
-def _refresh_congress_cache():
+def _build_congress_payload() -> dict:
     df = _load_congress_trades()
     payload = _compute_top_bottom(df, n=10)
     payload["generated_at"] = datetime.utcnow().isoformat() + "Z"
-    CACHE.update(congress=payload, ts=time.time())
+    # Last good payload on disk so a restarted worker can serve it before the first scrape
+    try:
+        _write_cache_file(CONGRESS_CACHE_PATH, json.dumps(payload).encode())
+    except OSError as e:
+        print("congress cache write failed:", repr(e))
+    return payload
+
+def _load_congress_cache_from_disk():
+    try:
+        CACHE.set(json.loads(CONGRESS_CACHE_PATH.read_text()), ts=CONGRESS_CACHE_PATH.stat().st_mtime)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print("congress cache load failed:", repr(e))
+
+async def _refresh_congress_cache():
+    await CACHE.refresh(lambda: asyncio.to_thread(_build_congress_payload))
 
 @app.get("/api/congress/top-bottom")
-def congress_top_bottom():
-    now = time.time()
-    if CACHE["congress"] and now - CACHE["ts"] < CACHE_TTL:
-        return CACHE["congress"]
-    df = _load_congress_trades()
-    payload = _compute_top_bottom(df, n=10)
-    payload["generated_at"] = datetime.utcnow().isoformat() + "Z"
-    CACHE.update(congress=payload, ts=now)
-    return payload
+async def congress_top_bottom():
+    stale = CACHE.payload is not None and not CACHE.fresh()
+    payload = await CACHE.get(lambda: asyncio.to_thread(_build_congress_payload))
+    # Past TTL the cached payload is served while the refresh runs in the background
+    return {**payload, "stale": stale}
 
 # Add this endpoint to fetch and cache enacted laws
 @app.get("/api/congress/enacted-laws")
@@ -551,30 +793,33 @@ async def congress_enacted_laws(refresh: bool = False):
 
 
 # ================= Portfolio APIs =================
+async def _yahoo_headlines(sym: str) -> list[dict]:
+    url = f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={sym}&region=US&lang=en-US"
+    try:
+        r = await NEWS_CLIENT.get(url); r.raise_for_status()
+    except Exception as e:
+        print(f"Yahoo feed error for {sym}:", repr(e))
+        return []
+    return [{"title": e.get("title"), "url": e.get("link"),
+             "source": "Yahoo Finance",
+             "published_at": e.get("published") or e.get("updated")}
+            for e in _parse_feed_minimal(r.content)[:30]]
+
 @app.get("/api/news")
-def portfolio_news(tickers: str = Query(..., description="comma separated tickers")):
+async def portfolio_news(tickers: str = Query(..., description="comma separated tickers")):
     syms = [s.strip().upper() for s in tickers.split(",") if s.strip()]
     if not syms: return {"count": 0, "articles": []}
-    arts = []
-    for s in syms:
-        url = f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={s}&region=US&lang=en-US"
-        feed = feedparser.parse(url)
-        for e in feed.entries[:30]:
-            arts.append({"title": e.get("title"), "url": e.get("link"),
-                         "source": "Yahoo Finance",
-                         "published_at": e.get("published") or e.get("updated")})
-    seen, out = set(), []
-    for a in arts:
-        if a["url"] and a["url"] not in seen:
-            seen.add(a["url"]); out.append(a)
-    return {"count": len(out), "articles": out[:100]}
+    per_sym = await asyncio.gather(*(_yahoo_headlines(s) for s in syms))
+    dedup: dict[str, dict] = {}
+    for a in (x for arts in per_sym for x in arts):
+        u = a["url"]
+        if u and u not in dedup:
+            dedup[u] = a
+            if len(dedup) >= 100: break
+    out = list(dedup.values())
+    return {"count": len(out), "articles": out}
 
 # =============== FRED Data Retrieval ==============
-from sqlalchemy import create_engine, text
-from fastapi.responses import JSONResponse
-import os
-import pandas as pd  # optional here, but fine to keep
-
 DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL, pool_pre_ping=True) if DATABASE_URL else None
 
@@ -588,26 +833,26 @@ FRED_COLUMNS = [
 def get_fred_series(series: str, months: int = 60):
     # Guard: DB not configured locally
     if engine is None:
-        return JSONResponse({"error": "DATABASE_URL not configured"}, status_code=500)
+        return ORJSONResponse({"error": "DATABASE_URL not configured"}, status_code=500)
 
     # Guard: unknown column
     if series not in FRED_COLUMNS:
-        return JSONResponse({"error": f"unknown series '{series}'"}, status_code=400)
+        return ORJSONResponse({"error": f"unknown series '{series}'"}, status_code=400)
 
-    q = text(f'''
-        SELECT date, "{series}" AS value
-        FROM fred_all_series
-        WHERE "{series}" IS NOT NULL
+    q = text('''
+        SELECT date, value
+        FROM fred_observations
+        WHERE series_id = :series AND value IS NOT NULL
         ORDER BY date DESC
         LIMIT :limit
     ''')
 
     with engine.begin() as conn:
-        rows = conn.execute(q, {"limit": months}).fetchall()
+        rows = conn.execute(q, {"series": series, "limit": months}).fetchall()
 
     # chronological order for chart
     rows = list(reversed(rows))
-    return JSONResponse([
+    return ORJSONResponse([
         {"date": r[0].strftime("%Y-%m-%d"),
          series: float(r[1]) if r[1] is not None else None}
         for r in rows
@@ -617,22 +862,23 @@ def get_fred_series(series: str, months: int = 60):
 def get_fred_last_updated():
     """Get the most recent date across all FRED series"""
     if engine is None:
-        return JSONResponse({"error": "DATABASE_URL not configured"}, status_code=500)
+        return ORJSONResponse({"error": "DATABASE_URL not configured"}, status_code=500)
     
     q = text('''
         SELECT MAX(date) as last_date
-        FROM fred_all_series
+        FROM fred_observations
+        WHERE series_id = ANY(:series)
     ''')
     
     with engine.begin() as conn:
-        result = conn.execute(q).fetchone()
+        result = conn.execute(q, {"series": FRED_COLUMNS}).fetchone()
         if result and result[0]:
-            return JSONResponse({
+            return ORJSONResponse({
                 "last_updated": result[0].strftime("%Y-%m-%d"),
                 "formatted": result[0].strftime("%B %d, %Y")
             })
         else:
-            return JSONResponse({"error": "No data available"}, status_code=404)
+            return ORJSONResponse({"error": "No data available"}, status_code=404)
 
 # =============== COMMODITIES API ==============
 try:
@@ -642,45 +888,56 @@ except ImportError:
     INDUSTRY_IMPACTS = {}
     CATEGORIES = {}
 
+# Plain-dict copies for orjson, which doesn't serialize namedtuples or mappingproxy;
+# sensitivity keeps its lowercase label ("high") rather than the enum's int value
+COMMODITY_METADATA_PAYLOAD = {name: info._asdict() for name, info in COMMODITY_SERIES.items()}
+COMMODITY_IMPACTS_PAYLOAD = {
+    industry: {**info,
+               "price_up_benefits": dict(info["price_up_benefits"]),
+               "price_up_hurts": dict(info["price_up_hurts"]),
+               "sensitivity": info["sensitivity"].name.lower()}
+    for industry, info in INDUSTRY_IMPACTS.items()
+}
+
 @app.get("/api/commodities/metadata")
 def get_commodities_metadata():
     """Return metadata about all tracked commodities"""
-    return JSONResponse(COMMODITY_SERIES)
+    return ORJSONResponse(COMMODITY_METADATA_PAYLOAD)
 
 @app.get("/api/commodities/impacts")
 def get_commodities_impacts():
     """Return stock impact data for commodities"""
-    return JSONResponse(INDUSTRY_IMPACTS)
+    return ORJSONResponse(COMMODITY_IMPACTS_PAYLOAD)
 
 @app.get("/api/commodities/{series}")
 def get_commodity_series(series: str, months: int = 60):
     """Get commodity price data for a specific series"""
     if engine is None:
-        return JSONResponse({"error": "DATABASE_URL not configured"}, status_code=500)
+        return ORJSONResponse({"error": "DATABASE_URL not configured"}, status_code=500)
     
     # Check if this is a valid commodity series
     if series not in COMMODITY_SERIES:
-        return JSONResponse({"error": f"unknown commodity series '{series}'"}, status_code=400)
+        return ORJSONResponse({"error": f"unknown commodity series '{series}'"}, status_code=400)
     
-    q = text(f'''
-        SELECT date, "{series}" AS value
-        FROM fred_commodities
-        WHERE "{series}" IS NOT NULL
+    q = text('''
+        SELECT date, value
+        FROM fred_observations
+        WHERE series_id = :series AND value IS NOT NULL
         ORDER BY date DESC
         LIMIT :limit
     ''')
     
     try:
         with engine.begin() as conn:
-            rows = conn.execute(q, {"limit": months}).fetchall()
+            rows = conn.execute(q, {"series": series, "limit": months}).fetchall()
         
         # chronological order for chart
         rows = list(reversed(rows))
-        return JSONResponse([
+        return ORJSONResponse([
             {"date": r[0].strftime("%Y-%m-%d"),
              series: float(r[1]) if r[1] is not None else None}
             for r in rows
         ])
     except Exception as e:
         # Table might not exist yet
-        return JSONResponse({"error": f"Commodity data not available: {str(e)}"}, status_code=404)
\ No newline at end of file
+        return ORJSONResponse({"error": f"Commodity data not available: {str(e)}"}, status_code=404)
\ No newline at end of file
@@ -2,299 +2,103 @@
 Comprehensive commodity and input cost tracking data
 Organized by industry with impact mappings
 """
+import hashlib
+import os
+import re
+import sys
+from enum import IntEnum
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Sensitivity(IntEnum):
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    EXTREME = 4
+
+
+class Commodity(NamedTuple):
+    fred_id: str
+    label: str
+    unit: str
+    category: str
+
 
 # ==================== COMMODITY SERIES ====================
 COMMODITY_SERIES = {
     # ===== ENERGY =====
-    "Crude_Oil_WTI": {
-        "fred_id": "DCOILWTICO",
-        "label": "Crude Oil (WTI)",
-        "unit": "$/barrel",
-        "category": "Energy"
-    },
-    "Crude_Oil_Brent": {
-        "fred_id": "DCOILBRENTEU",
-        "label": "Crude Oil (Brent)",
-        "unit": "$/barrel",
-        "category": "Energy"
-    },
-    "Natural_Gas": {
-        "fred_id": "DHHNGSP",
-        "label": "Natural Gas (Henry Hub)",
-        "unit": "$/MMBtu",
-        "category": "Energy"
-    },
-    "Gasoline": {
-        "fred_id": "GASREGW",
-        "label": "Gasoline (Regular)",
-        "unit": "$/gallon",
-        "category": "Energy"
-    },
-    "Heating_Oil": {
-        "fred_id": "DHOILNYH",
-        "label": "Heating Oil",
-        "unit": "$/gallon",
-        "category": "Energy"
-    },
-    "Propane": {
-        "fred_id": "DPROPANEMBTX",
-        "label": "Propane",
-        "unit": "$/gallon",
-        "category": "Energy"
-    },
+    "Crude_Oil_WTI": Commodity("DCOILWTICO", "Crude Oil (WTI)", "$/barrel", "Energy"),
+    "Crude_Oil_Brent": Commodity("DCOILBRENTEU", "Crude Oil (Brent)", "$/barrel", "Energy"),
+    "Natural_Gas": Commodity("DHHNGSP", "Natural Gas (Henry Hub)", "$/MMBtu", "Energy"),
+    "Gasoline": Commodity("GASREGW", "Gasoline (Regular)", "$/gallon", "Energy"),
+    "Heating_Oil": Commodity("DHOILNYH", "Heating Oil", "$/gallon", "Energy"),
+    "Propane": Commodity("DPROPANEMBTX", "Propane", "$/gallon", "Energy"),
     
     # ===== METALS & MINING =====
-    "Copper": {
-        "fred_id": "PCOPPUSDM",
-        "label": "Copper",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
-    "Aluminum": {
-        "fred_id": "PALUMUSDM",
-        "label": "Aluminum",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
-    "Iron_Ore": {
-        "fred_id": "PIORECRUSDM",
-        "label": "Iron Ore",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
-    "Steel_Import": {
-        "fred_id": "IQ12260",
-        "label": "Steel Import Prices",
-        "unit": "Index",
-        "category": "Metals"
-    },
-    "Nickel": {
-        "fred_id": "PNICKUSDM",
-        "label": "Nickel",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
-    "Zinc": {
-        "fred_id": "PZINCUSDM",
-        "label": "Zinc",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
-    "Lead": {
-        "fred_id": "PLEADUSDM",
-        "label": "Lead",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
-    "Tin": {
-        "fred_id": "PTINUSDM",
-        "label": "Tin",
-        "unit": "$/metric ton",
-        "category": "Metals"
-    },
+    "Copper": Commodity("PCOPPUSDM", "Copper", "$/metric ton", "Metals"),
+    "Aluminum": Commodity("PALUMUSDM", "Aluminum", "$/metric ton", "Metals"),
+    "Iron_Ore": Commodity("PIORECRUSDM", "Iron Ore", "$/metric ton", "Metals"),
+    "Steel_Import": Commodity("IQ12260", "Steel Import Prices", "Index", "Metals"),
+    "Nickel": Commodity("PNICKUSDM", "Nickel", "$/metric ton", "Metals"),
+    "Zinc": Commodity("PZINCUSDM", "Zinc", "$/metric ton", "Metals"),
+    "Lead": Commodity("PLEADUSDM", "Lead", "$/metric ton", "Metals"),
+    "Tin": Commodity("PTINUSDM", "Tin", "$/metric ton", "Metals"),
     
     # ===== PRECIOUS METALS =====
-    "Gold": {
-        "fred_id": "GOLDAMGBD228NLBM",
-        "label": "Gold",
-        "unit": "$/troy oz",
-        "category": "Precious Metals"
-    },
-    "Silver": {
-        "fred_id": "SLVPRUSD",
-        "label": "Silver",
-        "unit": "$/troy oz",
-        "category": "Precious Metals"
-    },
-    "Platinum": {
-        "fred_id": "PLATINUMPRICE",
-        "label": "Platinum",
-        "unit": "$/troy oz",
-        "category": "Precious Metals"
-    },
-    "Palladium": {
-        "fred_id": "PALLFMUSD",
-        "label": "Palladium",
-        "unit": "$/troy oz",
-        "category": "Precious Metals"
-    },
+    "Gold": Commodity("GOLDAMGBD228NLBM", "Gold", "$/troy oz", "Precious Metals"),
+    "Silver": Commodity("SLVPRUSD", "Silver", "$/troy oz", "Precious Metals"),
+    "Platinum": Commodity("PLATINUMPRICE", "Platinum", "$/troy oz", "Precious Metals"),
+    "Palladium": Commodity("PALLFMUSD", "Palladium", "$/troy oz", "Precious Metals"),
     
     # ===== AGRICULTURE - GRAINS =====
-    "Wheat": {
-        "fred_id": "PWHEAMTUSDM",
-        "label": "Wheat",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Grains"
-    },
-    "Corn": {
-        "fred_id": "PMAIZMTUSDM",
-        "label": "Corn (Maize)",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Grains"
-    },
-    "Soybeans": {
-        "fred_id": "PSOYBUSDM",
-        "label": "Soybeans",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Grains"
-    },
-    "Rice": {
-        "fred_id": "PRICENPQUSDM",
-        "label": "Rice",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Grains"
-    },
-    "Barley": {
-        "fred_id": "PBARLUSDM",
-        "label": "Barley",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Grains"
-    },
+    "Wheat": Commodity("PWHEAMTUSDM", "Wheat", "$/metric ton", "Agriculture - Grains"),
+    "Corn": Commodity("PMAIZMTUSDM", "Corn (Maize)", "$/metric ton", "Agriculture - Grains"),
+    "Soybeans": Commodity("PSOYBUSDM", "Soybeans", "$/metric ton", "Agriculture - Grains"),
+    "Rice": Commodity("PRICENPQUSDM", "Rice", "$/metric ton", "Agriculture - Grains"),
+    "Barley": Commodity("PBARLUSDM", "Barley", "$/metric ton", "Agriculture - Grains"),
     
     # ===== AGRICULTURE - SOFT COMMODITIES =====
-    "Coffee": {
-        "fred_id": "PCOFFOTMUSDM",
-        "label": "Coffee (Arabica)",
-        "unit": "$/kg",
-        "category": "Agriculture - Soft"
-    },
-    "Cocoa": {
-        "fred_id": "PCOCOCUSDM",
-        "label": "Cocoa Beans",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Soft"
-    },
-    "Sugar": {
-        "fred_id": "PSUGAISAUSDM",
-        "label": "Sugar",
-        "unit": "$/kg",
-        "category": "Agriculture - Soft"
-    },
-    "Cotton": {
-        "fred_id": "PCOTTINDUSDM",
-        "label": "Cotton",
-        "unit": "$/kg",
-        "category": "Agriculture - Soft"
-    },
-    "Orange_Juice": {
-        "fred_id": "POJUICEUSDM",
-        "label": "Orange Juice",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Soft"
-    },
+    "Coffee": Commodity("PCOFFOTMUSDM", "Coffee (Arabica)", "$/kg", "Agriculture - Soft"),
+    "Cocoa": Commodity("PCOCOCUSDM", "Cocoa Beans", "$/metric ton", "Agriculture - Soft"),
+    "Sugar": Commodity("PSUGAISAUSDM", "Sugar", "$/kg", "Agriculture - Soft"),
+    "Cotton": Commodity("PCOTTINDUSDM", "Cotton", "$/kg", "Agriculture - Soft"),
+    "Orange_Juice": Commodity("POJUICEUSDM", "Orange Juice", "$/metric ton", "Agriculture - Soft"),
     
     # ===== AGRICULTURE - LIVESTOCK =====
-    "Beef": {
-        "fred_id": "PBEEFUSDM",
-        "label": "Beef",
-        "unit": "$/kg",
-        "category": "Agriculture - Livestock"
-    },
-    "Pork": {
-        "fred_id": "PPORKUSDM",
-        "label": "Pork (Swine)",
-        "unit": "$/kg",
-        "category": "Agriculture - Livestock"
-    },
-    "Chicken": {
-        "fred_id": "PPOULT01USM156NNBR",
-        "label": "Chicken (Poultry)",
-        "unit": "$/pound",
-        "category": "Agriculture - Livestock"
-    },
+    "Beef": Commodity("PBEEFUSDM", "Beef", "$/kg", "Agriculture - Livestock"),
+    "Pork": Commodity("PPORKUSDM", "Pork (Swine)", "$/kg", "Agriculture - Livestock"),
+    "Chicken": Commodity("PPOULT01USM156NNBR", "Chicken (Poultry)", "$/pound", "Agriculture - Livestock"),
     
     # ===== CONSTRUCTION MATERIALS =====
-    "Lumber": {
-        "fred_id": "WPU0811",
-        "label": "Lumber",
-        "unit": "Index",
-        "category": "Construction"
-    },
-    "Cement": {
-        "fred_id": "PCU32731273127",
-        "label": "Cement Prices",
-        "unit": "Index",
-        "category": "Construction"
-    },
+    "Lumber": Commodity("WPU0811", "Lumber", "Index", "Construction"),
+    "Cement": Commodity("PCU32731273127", "Cement Prices", "Index", "Construction"),
     
     # ===== CHEMICALS & PLASTICS =====
-    "Crude_Oil_Chemicals": {
-        "fred_id": "WPU0613",
-        "label": "Chemicals & Allied Products",
-        "unit": "Index",
-        "category": "Chemicals"
-    },
-    "Plastics": {
-        "fred_id": "WPU0719",
-        "label": "Plastic Resins & Materials",
-        "unit": "Index",
-        "category": "Chemicals"
-    },
+    "Crude_Oil_Chemicals": Commodity("WPU0613", "Chemicals & Allied Products", "Index", "Chemicals"),
+    "Plastics": Commodity("WPU0719", "Plastic Resins & Materials", "Index", "Chemicals"),
     
     # ===== TEXTILES & MATERIALS =====
-    "Rubber": {
-        "fred_id": "PRUBBUSDM",
-        "label": "Rubber",
-        "unit": "$/kg",
-        "category": "Materials"
-    },
-    "Wool": {
-        "fred_id": "PWOOLCUSDM",
-        "label": "Wool (Coarse)",
-        "unit": "$/kg",
-        "category": "Materials"
-    },
+    "Rubber": Commodity("PRUBBUSDM", "Rubber", "$/kg", "Materials"),
+    "Wool": Commodity("PWOOLCUSDM", "Wool (Coarse)", "$/kg", "Materials"),
     
     # ===== PAPER & PULP =====
-    "Paper": {
-        "fred_id": "WPU0915",
-        "label": "Paper & Paper Products",
-        "unit": "Index",
-        "category": "Paper & Packaging"
-    },
-    "Pulp": {
-        "fred_id": "WPU0912",
-        "label": "Pulp & Paper Materials",
-        "unit": "Index",
-        "category": "Paper & Packaging"
-    },
+    "Paper": Commodity("WPU0915", "Paper & Paper Products", "Index", "Paper & Packaging"),
+    "Pulp": Commodity("WPU0912", "Pulp & Paper Materials", "Index", "Paper & Packaging"),
     
     # ===== FERTILIZERS =====
-    "Fertilizer": {
-        "fred_id": "PFERTMTUSDM",
-        "label": "Fertilizer Index",
-        "unit": "Index",
-        "category": "Agriculture - Inputs"
-    },
-    "Phosphate": {
-        "fred_id": "PPHOSROCKUSDM",
-        "label": "Phosphate Rock",
-        "unit": "$/metric ton",
-        "category": "Agriculture - Inputs"
-    },
+    "Fertilizer": Commodity("PFERTMTUSDM", "Fertilizer Index", "Index", "Agriculture - Inputs"),
+    "Phosphate": Commodity("PPHOSROCKUSDM", "Phosphate Rock", "$/metric ton", "Agriculture - Inputs"),
     
     # ===== RARE EARTHS & TECH MATERIALS =====
     # Note: Limited FRED data for rare earths, using proxies
-    "Semiconductor_Materials": {
-        "fred_id": "PCU333310333310",
-        "label": "Semiconductor Materials PPI",
-        "unit": "Index",
-        "category": "Technology Materials"
-    },
+    "Semiconductor_Materials": Commodity("PCU333310333310", "Semiconductor Materials PPI", "Index", "Technology Materials"),
     
     # ===== REAL ESTATE INPUTS =====
-    "Gypsum": {
-        "fred_id": "WPU13230103",
-        "label": "Gypsum Products",
-        "unit": "Index",
-        "category": "Construction"
-    },
-    "Concrete": {
-        "fred_id": "PCU32732273273",
-        "label": "Ready-Mix Concrete",
-        "unit": "Index",
-        "category": "Construction"
-    },
+    "Gypsum": Commodity("WPU13230103", "Gypsum Products", "Index", "Construction"),
+    "Concrete": Commodity("PCU32732273273", "Ready-Mix Concrete", "Index", "Construction"),
 }
 
 # ==================== STOCK IMPACT MATRIX ====================
@@ -657,17 +461,132 @@ INDUSTRY_IMPACTS = {
 }
 
 # ==================== CATEGORY GROUPINGS ====================
-CATEGORIES = {
-    "Energy": ["Crude_Oil_WTI", "Crude_Oil_Brent", "Natural_Gas", "Gasoline", "Heating_Oil", "Propane"],
-    "Metals": ["Copper", "Aluminum", "Iron_Ore", "Steel_Import", "Nickel", "Zinc", "Lead", "Tin"],
-    "Precious Metals": ["Gold", "Silver", "Platinum", "Palladium"],
-    "Agriculture - Grains": ["Wheat", "Corn", "Soybeans", "Rice", "Barley"],
-    "Agriculture - Soft": ["Coffee", "Cocoa", "Sugar", "Cotton", "Orange_Juice"],
-    "Agriculture - Livestock": ["Beef", "Pork", "Chicken"],
-    "Agriculture - Inputs": ["Fertilizer", "Phosphate"],
-    "Construction": ["Lumber", "Cement", "Gypsum", "Concrete"],
-    "Chemicals": ["Crude_Oil_Chemicals", "Plastics"],
-    "Materials": ["Rubber", "Wool"],
-    "Paper & Packaging": ["Paper", "Pulp"],
-    "Technology Materials": ["Semiconductor_Materials"]
-}
\ No newline at end of file
+# Derived from each series' "category" so the two can't drift apart
+COMMODITY_TO_CATEGORY = {name: info.category for name, info in COMMODITY_SERIES.items()}
+CATEGORY_TO_COMMODITIES = {}
+for _name, _cat in COMMODITY_TO_CATEGORY.items():
+    CATEGORY_TO_COMMODITIES.setdefault(_cat, []).append(_name)
+CATEGORIES = CATEGORY_TO_COMMODITIES
+
+# ==================== COLUMNAR VIEWS ====================
+# Parallel tuples over COMMODITY_SERIES (same order) for bulk iteration without per-row dict lookups
+_COMMODITY_NAMES = tuple(COMMODITY_SERIES)
+_FRED_IDS = tuple(info.fred_id for info in COMMODITY_SERIES.values())
+_LABELS = tuple(info.label for info in COMMODITY_SERIES.values())
+_UNITS = tuple(info.unit for info in COMMODITY_SERIES.values())
+_CATEGORIES = tuple(info.category for info in COMMODITY_SERIES.values())
+NAME_TO_IDX = {name: i for i, name in enumerate(_COMMODITY_NAMES)}
+# Reverse map for ingestion code that gets results keyed by FRED series id
+FRED_ID_TO_NAME = dict(zip(_FRED_IDS, _COMMODITY_NAMES))
+
+# Intern ticker/commodity keys so lookups from consumers hit the identity fast path
+for _info in INDUSTRY_IMPACTS.values():
+    _info["commodities"] = [sys.intern(c) for c in _info["commodities"]]
+    _info["price_up_benefits"] = MappingProxyType({sys.intern(t): n for t, n in _info["price_up_benefits"].items()})
+    _info["price_up_hurts"] = MappingProxyType({sys.intern(t): n for t, n in _info["price_up_hurts"].items()})
+    _info["sensitivity"] = Sensitivity[_info["sensitivity"].upper()]
+
+# Read-only ticker sets per industry for membership tests, shared instead of copied per call
+_TICKERS_FROZEN = {
+    industry: {"benefits": frozenset(info["price_up_benefits"]), "hurts": frozenset(info["price_up_hurts"])}
+    for industry, info in INDUSTRY_IMPACTS.items()
+}
+
+# ==================== TICKER EXPOSURES ====================
+# ticker -> [(industry, sensitivity, +1 if a price rise helps / -1 if it hurts), ...]
+TICKER_TO_EXPOSURES = {}
+for _industry, _info in INDUSTRY_IMPACTS.items():
+    for _t in _info["price_up_benefits"]:
+        TICKER_TO_EXPOSURES.setdefault(_t, []).append((_industry, _info["sensitivity"], 1))
+    for _t in _info["price_up_hurts"]:
+        TICKER_TO_EXPOSURES.setdefault(_t, []).append((_industry, _info["sensitivity"], -1))
+
+# ==================== FLAT IMPACT TABLE ====================
+# One row per (industry, ticker, commodity) link, for vectorized scoring across all tickers
+IMPACT_TICKERS = tuple(TICKER_TO_EXPOSURES)
+_TICKER_IDX = {t: i for i, t in enumerate(IMPACT_TICKERS)}
+IMPACT_TABLE = np.array(
+    [(_TICKER_IDX[t], t, c, sign, info["sensitivity"])
+     for info in INDUSTRY_IMPACTS.values()
+     for sign, tickers in ((1, info["price_up_benefits"]), (-1, info["price_up_hurts"]))
+     for t in tickers
+     for c in info["commodities"]],
+    dtype=[("ticker_idx", "i4"), ("ticker", "U6"), ("commodity", "U24"), ("sign", "i1"), ("sensitivity", "i1")],
+)
+
+
+def score_tickers(pct_moves):
+    """Net exposure score per ticker for {commodity: % move}, weighted by sensitivity."""
+    moved = np.array(list(pct_moves), dtype="U24")
+    moves = np.array(list(pct_moves.values()), dtype="float64")
+    order = np.argsort(moved)
+    moved, moves = moved[order], moves[order]
+    mask = np.isin(IMPACT_TABLE["commodity"], moved)
+    rows = IMPACT_TABLE[mask]
+    pct = moves[np.searchsorted(moved, rows["commodity"])]
+    scores = np.bincount(rows["ticker_idx"], weights=rows["sensitivity"] * rows["sign"] * pct,
+                         minlength=len(IMPACT_TICKERS))
+    return dict(zip(IMPACT_TICKERS, scores.astype("float64").tolist()))
+
+# ==================== INDUSTRY BITMASKS ====================
+# One bit per commodity (impact-only names like "Coal" get bits after the tracked series)
+COMMODITY_BIT = {name: i for i, name in enumerate(dict.fromkeys(
+    [*COMMODITY_SERIES, *(c for info in INDUSTRY_IMPACTS.values() for c in info["commodities"])]))}
+INDUSTRY_MASK = {
+    industry: sum(1 << COMMODITY_BIT[c] for c in set(info["commodities"]))
+    for industry, info in INDUSTRY_IMPACTS.items()
+}
+
+
+def industries_exposed_to(commodities):
+    """Industries whose impact entry lists any of `commodities`."""
+    s_mask = 0
+    for c in commodities:
+        if c in COMMODITY_BIT:
+            s_mask |= 1 << COMMODITY_BIT[c]
+    return [industry for industry, m in INDUSTRY_MASK.items() if m & s_mask]
+
+# ==================== NOTE HIGHLIGHTS ====================
+# Percent/dollar figures in each note, extracted once so the UI doesn't re-scan constant text
+_FIGURE_RE = re.compile(r"(\d+(?:\.\d+)?%|\$\d+[BMK]?)")
+NOTES_HIGHLIGHTS = {
+    industry: tuple(_FIGURE_RE.findall(info.get("notes", "")))
+    for industry, info in INDUSTRY_IMPACTS.items()
+}
+
+# ==================== READ-ONLY EXPORTS ====================
+# Everything above is derived; freeze the public tables so consumers can share them without copying
+COMMODITY_SERIES = MappingProxyType(COMMODITY_SERIES)
+INDUSTRY_IMPACTS = MappingProxyType({
+    sys.intern(industry): MappingProxyType({**info, "commodities": tuple(info["commodities"])})
+    for industry, info in INDUSTRY_IMPACTS.items()
+})
+CATEGORIES = CATEGORY_TO_COMMODITIES = MappingProxyType(
+    {cat: tuple(names) for cat, names in CATEGORY_TO_COMMODITIES.items()})
+NOTES_HIGHLIGHTS = MappingProxyType(NOTES_HIGHLIGHTS)
+COMMODITY_TO_CATEGORY = MappingProxyType(COMMODITY_TO_CATEGORY)
+NAME_TO_IDX = MappingProxyType(NAME_TO_IDX)
+FRED_ID_TO_NAME = MappingProxyType(FRED_ID_TO_NAME)
+TICKER_TO_EXPOSURES = MappingProxyType({t: tuple(exp) for t, exp in TICKER_TO_EXPOSURES.items()})
+COMMODITY_BIT = MappingProxyType(COMMODITY_BIT)
+INDUSTRY_MASK = MappingProxyType(INDUSTRY_MASK)
+
+# ==================== DEV VALIDATION ====================
+# blake2b of the series table last checked; a match skips the scan entirely
+_SCHEMA_FINGERPRINT = "921f31230b54d35a6fa82dd9dfe730c0"
+
+
+def _validate():
+    fp = hashlib.blake2b(repr(sorted(COMMODITY_SERIES.items())).encode(), digest_size=16).hexdigest()
+    if fp == _SCHEMA_FINGERPRINT:
+        return
+    for name, info in COMMODITY_SERIES.items():
+        if not all(info):
+            raise ValueError(f"commodity {name!r} has an empty field: {info}")
+    if len(FRED_ID_TO_NAME) != len(COMMODITY_SERIES):
+        raise ValueError("duplicate fred_id in COMMODITY_SERIES")
+    print(f"commodities_data: series table validated; update _SCHEMA_FINGERPRINT to {fp}")
+
+
+if os.environ.get("VALIDATE_COMMODITIES"):
+    _validate()
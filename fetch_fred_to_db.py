@@ -1,64 +1,21 @@
 ﻿#!/usr/bin/env python3
+import asyncio
+import io
 import os
 import sys
-
-# --- Load environment variables FIRST ---
-try:
-    from dotenv import load_dotenv
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Try api.env first (in script directory)
-    api_env_path = os.path.join(script_dir, "api.env")
-    env_path = os.path.join(script_dir, ".env")
-    
-    if os.path.exists(api_env_path):
-        load_dotenv(api_env_path)
-        print(f"✓ Loaded environment from: {api_env_path}")
-    elif os.path.exists(env_path):
-        load_dotenv(env_path)
-        print(f"✓ Loaded environment from: {env_path}")
-    else:
-        print(f"⚠️  No api.env or .env file found in: {script_dir}")
-        print(f"   Looking for: {api_env_path}")
-except ImportError:
-    print("⚠️  python-dotenv not installed. Install with: pip install python-dotenv")
-except Exception as e:
-    print(f"⚠️  Error loading .env file: {e}")
-
-# --- Check required environment variables ---
-fred_key = os.getenv("FRED_API_KEY")
-db_url = os.getenv("DATABASE_URL")
-
-print(f"\nEnvironment check:")
-print(f"  FRED_API_KEY: {'✓ Set' if fred_key else '✗ Missing'}")
-print(f"  DATABASE_URL: {'✓ Set' if db_url else '✗ Missing'}")
-
-if not db_url:
-    print("\n❌ ERROR: DATABASE_URL is required but not set!")
-    print("\nPlease ensure api.env file exists with:")
-    print("  DATABASE_URL=postgresql://...")
-    sys.exit(1)
-
-if not fred_key:
-    print("\n⚠️  WARNING: FRED_API_KEY not set. Data fetching may be rate-limited.")
-    print("   Get a free key from: https://fred.stlouisfed.org/docs/api/api_key.html")
-else:
-    os.environ["FRED_API_KEY"] = fred_key
-
-# --- Shim for Python 3.12+ (stdlib removed 'distutils'); pandas-datareader 0.10 still imports it
-try:
-    import distutils  # noqa: F401
-except ModuleNotFoundError:
-    import importlib
-    import setuptools  # ensure present from requirements.txt
-    sys.modules["distutils"] = importlib.import_module("setuptools._distutils")
-# ------------------------------------------------------------------------------
-
 from datetime import datetime
+from functools import reduce
+from pathlib import Path
+import httpx
+import numpy as np
+import orjson
 import pandas as pd
-from pandas_datareader import data as pdr
-from sqlalchemy import create_engine, text
+from sqlalchemy import REAL, Column, Date, MetaData, Table, Text, column, create_engine, delete, insert, select, table
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateTable
+
+SCRIPT_DIR = Path(__file__).resolve().parent
 
 # --- Import commodity data ---
 try:
@@ -67,6 +24,15 @@ except ImportError:
     print("⚠️  Warning: commodities_data.py not found, using empty dict")
     COMMODITY_SERIES = {}
 
+# --- Storage: one row per (series, month-end) ---
+metadata = MetaData()
+FRED_OBSERVATIONS = Table(
+    "fred_observations", metadata,
+    Column("series_id", Text, primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("value", REAL),
+)
+
 # --- Original macroeconomic series ---
 MACRO_SERIES = {
     "Real_GDP": "GDPC1",
@@ -83,164 +49,208 @@ MACRO_SERIES = {
     "Job_Openings_JOLTS": "JTSJOL",
 }
 
-def fetch_series(series_id: str, start="1990-01-01") -> pd.Series:
-    s = pdr.DataReader(series_id, "fred", start=start).iloc[:, 0]
-    s.name = series_id
+FRED_OBS_URL = "https://api.stlouisfed.org/fred/series/observations"
+FRED_CONCURRENCY = 5  # FRED allows ~120 requests/minute per key
+# Per-series history from earlier runs; later runs only re-ask FRED for the recent tail.
+# Delete the directory to force a full re-download (e.g. to pick up benchmark revisions).
+FRED_CACHE_DIR = SCRIPT_DIR / ".cache" / "fred"
+FRED_REVISION_MONTHS = 12  # tail re-fetched each run; PAYEMS, GDPC1, RSAFS, JTSJOL revise recent values
+FRED_STAGE_TABLE = "fred_observations_stage"  # per-transaction COPY target for the upsert
+
+def load_config() -> dict:
+    """Load api.env (or .env) from the script directory and return the settings main() needs."""
+    try:
+        from dotenv import load_dotenv
+        env_path = next((p for p in (SCRIPT_DIR / "api.env", SCRIPT_DIR / ".env") if p.exists()), None)
+        if env_path:
+            load_dotenv(env_path)
+            print(f"✓ Loaded environment from: {env_path}")
+        else:
+            print(f"⚠️  No api.env or .env file found in: {SCRIPT_DIR}")
+            print(f"   Looking for: {SCRIPT_DIR / 'api.env'}")
+    except ImportError:
+        print("⚠️  python-dotenv not installed. Install with: pip install python-dotenv")
+    except Exception as e:
+        print(f"⚠️  Error loading .env file: {e}")
+
+    config = {"fred_key": os.getenv("FRED_API_KEY"), "db_url": os.getenv("DATABASE_URL")}
+    print(f"\nEnvironment check:")
+    print(f"  FRED_API_KEY: {'✓ Set' if config['fred_key'] else '✗ Missing'}")
+    print(f"  DATABASE_URL: {'✓ Set' if config['db_url'] else '✗ Missing'}")
+    return config
+
+async def fetch_series_async(client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                             series_id: str, api_key: str, start="1990-01-01") -> pd.Series:
+    cache_path = FRED_CACHE_DIR / f"{series_id}.pkl"
+    cached = pd.read_pickle(cache_path) if cache_path.exists() else None
+    if cached is not None and not cached.empty:
+        tail = cached.index.max() - pd.DateOffset(months=FRED_REVISION_MONTHS)
+        start = max(start, tail.strftime("%Y-%m-%d"))
+    end = datetime.now().strftime("%Y-%m-%d")
+
+    # Bound both ends so long daily histories (e.g. DGS10) only send the window we store
+    params = {"series_id": series_id, "api_key": api_key, "file_type": "json",
+              "observation_start": start, "observation_end": end}
+    async with sem:
+        r = await client.get(FRED_OBS_URL, params=params)
+    r.raise_for_status()
+    obs = orjson.loads(r.content)["observations"]
+    n = len(obs)
+    print(f"    {series_id}: {n} observations from {start}")
+    dates = np.fromiter((o["date"] for o in obs), dtype="datetime64[D]", count=n)
+    # Missing observations come back as "."; values stay float32 / REAL end to end since
+    # no series here carries more than ~7 significant digits
+    values = np.fromiter((np.nan if o["value"] == "." else float(o["value"]) for o in obs),
+                         dtype=np.float32, count=n)
+    s = pd.Series(values, index=pd.DatetimeIndex(dates), name=series_id, copy=False)
+
+    if cached is not None:
+        # Re-fetched tail wins, so revised values replace the cached first releases
+        s = pd.concat([cached, s])
+        s = s[~s.index.duplicated(keep="last")].sort_index().astype("float32")
+    FRED_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    s.to_pickle(cache_path)
     return s
 
+async def _fetch_all(series_ids, api_key, start="1990-01-01"):
+    sem = asyncio.Semaphore(FRED_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=10)) as client:
+        return await asyncio.gather(*(fetch_series_async(client, sem, fid, api_key, start) for fid in series_ids),
+                                    return_exceptions=True)
+
+def fetch_all(series_map: dict, api_key: str) -> dict:
+    """Fetch every {label: fred_id} concurrently; failed labels map to their exception."""
+    return dict(zip(series_map, asyncio.run(_fetch_all(series_map.values(), api_key))))
+
+def copy_df(conn, df: pd.DataFrame, table: str):
+    """Bulk-load df into table with COPY FROM STDIN on conn's own transaction (psycopg2)."""
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep="\\N", float_format="%.7g")
+    buf.seek(0)
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    with conn.connection.dbapi_connection.cursor() as cur:
+        cur.copy_expert(f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+
 def to_monthly(df):
+    """Month-end values (Series or DataFrame), each carrying forward the latest observation on or before that date."""
     df.index = pd.to_datetime(df.index)
-    m_start = df.index.min().to_period("M").to_timestamp("M")
-    m_end = df.index.max().to_period("M").to_timestamp("M")
-    
+    df = df.sort_index().ffill()
+
     # Try 'ME' first (pandas 2.2+), fallback to 'M' for older versions
     try:
-        idx = pd.date_range(m_start, m_end, freq="ME")
+        out = df.resample("ME").last()
     except ValueError:
-        idx = pd.date_range(m_start, m_end, freq="M")
-    
-    return df.asfreq("D").ffill().reindex(idx).ffill()
+        out = df.resample("M").last()
+
+    out = out.ffill()
+    out.index.name = None
+    return out
+
+def monthly_frame(data: dict) -> pd.DataFrame:
+    """Resample each series on its own index, then align the month-end results."""
+    monthly = {label: to_monthly(s) for label, s in data.items()}
+    union_idx = reduce(lambda a, b: a.union(b), (s.index for s in monthly.values()), pd.DatetimeIndex([]))
+    arr = np.full((len(union_idx), len(monthly)), np.nan, dtype=np.float32)
+    for j, s in enumerate(monthly.values()):
+        arr[union_idx.get_indexer(s.index), j] = s.to_numpy()
+    return pd.DataFrame(arr, index=union_idx, columns=list(monthly)).ffill()
+
+def make_engine(url: str):
+    """Engine with multi-row batching for executemany writes that don't go through COPY."""
+    kwargs = {"pool_pre_ping": True}
+    u = make_url(url)
+    if u.get_backend_name() == "postgresql":
+        kwargs["insertmanyvalues_page_size"] = 1000
+        if u.get_driver_name() == "psycopg2":
+            kwargs.update(executemany_mode="values_plus_batch", executemany_batch_page_size=500)
+    return create_engine(url, **kwargs)
+
+def _records(df: pd.DataFrame) -> list:
+    return df.assign(date=df["date"].dt.date).to_dict(orient="records")
+
+def _upsert(stmt):
+    """ON CONFLICT (series_id, date) take the new value, skipping rows whose value is unchanged."""
+    tbl = FRED_OBSERVATIONS
+    return stmt.on_conflict_do_update(
+        index_elements=[tbl.c.series_id, tbl.c.date],
+        set_={"value": stmt.excluded.value},
+        where=tbl.c.value.is_distinct_from(stmt.excluded.value),
+    )
+
+def write_observations(engine, df: pd.DataFrame):
+    """Write df (series_id, date, value) to fred_observations.
+
+    PostgreSQL upserts on (series_id, date) and leaves unchanged rows alone; other
+    dialects delete and reinsert every row of the series in df.
+    """
+    tbl = FRED_OBSERVATIONS
+    with engine.begin() as conn:
+        if conn.dialect.name != "postgresql":
+            tbl.create(conn, checkfirst=True)
+            conn.execute(delete(tbl).where(tbl.c.series_id.in_(df["series_id"].unique().tolist())))
+            conn.execute(insert(tbl), _records(df))
+            return
+
+        use_copy = conn.dialect.driver == "psycopg2"
+        ddl = [str(CreateTable(tbl, if_not_exists=True).compile(dialect=conn.dialect))]
+        if use_copy:
+            ddl.append(f"CREATE TEMP TABLE {FRED_STAGE_TABLE} (LIKE {tbl.name}) ON COMMIT DROP")
+        # All DDL in one multi-statement round-trip
+        conn.execution_options(no_parameters=True).exec_driver_sql(";\n".join(ddl))
+        if use_copy:
+            copy_df(conn, df, FRED_STAGE_TABLE)
+            stage = table(FRED_STAGE_TABLE, *(column(c) for c in df.columns))
+            conn.execute(_upsert(pg_insert(tbl).from_select(list(df.columns), select(stage))))
+        else:
+            conn.execute(_upsert(pg_insert(tbl)), _records(df))
+
+def run_fetch(series_map: dict, engine, api_key: str):
+    """Fetch {label: fred_id}, resample to month-end and upsert those labels into fred_observations."""
+    data = {}
+    for label, result in fetch_all(series_map, api_key).items():
+        if isinstance(result, Exception):
+            print(f"  ✗ Error fetching {label}: {result}")
+        else:
+            data[label] = result
+            print(f"  ✓ {label}")
+
+    if not data:
+        print("⚠️  No data to write")
+        return
+    # Long format, one row per (series, month-end); readers pivot if they need wide
+    df = (monthly_frame(data).rename_axis("date").reset_index()
+          .melt(id_vars="date", var_name="series_id", value_name="value")
+          .dropna(subset=["value"])[["series_id", "date", "value"]])
+    write_observations(engine, df)
+    print(f"✅ {len(data)} series written to fred_observations")
 
 def main():
     print("\n" + "="*60)
     print("FRED Data Fetcher - Macroeconomic + Commodities")
     print("="*60)
-    
-    engine = create_engine(db_url, pool_pre_ping=True)
 
-    # ===== Fetch Macro Series =====
-    print("\n📊 Fetching Macroeconomic Series...")
-    macro_data = {}
-    for label, fid in MACRO_SERIES.items():
-        try:
-            macro_data[label] = fetch_series(fid)
-            print(f"  ✓ {label}")
-        except Exception as e:
-            print(f"  ✗ Error fetching {label}: {e}")
+    config = load_config()
+    if not config["db_url"]:
+        print("\n❌ ERROR: DATABASE_URL is required but not set!")
+        print("\nPlease ensure api.env file exists with:")
+        print("  DATABASE_URL=postgresql://...")
+        sys.exit(1)
+    if not config["fred_key"]:
+        print("\n❌ ERROR: FRED_API_KEY is required by the FRED observations API but not set!")
+        print("   Get a free key from: https://fred.stlouisfed.org/docs/api/api_key.html")
+        sys.exit(1)
 
-    macro_df = pd.concat(macro_data, axis=1)
-    macro_df = to_monthly(macro_df)
-    macro_df.reset_index(inplace=True)
-    macro_df.rename(columns={"index": "date"}, inplace=True)
+    engine = make_engine(config["db_url"])
+
+    print("\n📊 Fetching Macroeconomic Series...")
+    run_fetch(MACRO_SERIES, engine, config["fred_key"])
 
-    # ===== Fetch Commodity Series =====
     print("\n🔨 Fetching Commodity Series...")
-    commodity_data = {}
-    for label, info in COMMODITY_SERIES.items():
-        fid = info["fred_id"]
-        try:
-            commodity_data[label] = fetch_series(fid)
-            print(f"  ✓ {info['label']} ({label})")
-        except Exception as e:
-            print(f"  ✗ Error fetching {info['label']}: {e}")
-
-    if commodity_data:
-        commodity_df = pd.concat(commodity_data, axis=1)
-        commodity_df = to_monthly(commodity_df)
-        commodity_df.reset_index(inplace=True)
-        commodity_df.rename(columns={"index": "date"}, inplace=True)
-    else:
-        commodity_df = pd.DataFrame()
-
-    # ===== Write to Database =====
-    print("\n💾 Writing to database...")
-    with engine.begin() as conn:
-        # Create/update macro table
-        macro_cols = ", ".join([f'"{c}" DOUBLE PRECISION' for c in MACRO_SERIES.keys()])
-        conn.execute(text(f"""
-            CREATE TABLE IF NOT EXISTS fred_all_series (
-                date DATE PRIMARY KEY,
-                {macro_cols}
-            );
-        """))
-        conn.execute(text("TRUNCATE fred_all_series;"))
-        macro_df.to_sql("fred_all_series", conn, if_exists="append", index=False)
-        print("✅ Macroeconomic data written to fred_all_series")
-
-        # Create/update commodity table
-        if not commodity_df.empty:
-            commodity_cols = ", ".join([f'"{c}" DOUBLE PRECISION' for c in commodity_data.keys()])
-            conn.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS fred_commodities (
-                    date DATE PRIMARY KEY,
-                    {commodity_cols}
-                );
-            """))
-            conn.execute(text("TRUNCATE fred_commodities;"))
-            commodity_df.to_sql("fred_commodities", conn, if_exists="append", index=False)
-            print("✅ Commodity data written to fred_commodities")
-        else:
-            print("⚠️  No commodity data to write")
+    run_fetch({label: info.fred_id for label, info in COMMODITY_SERIES.items()}, engine, config["fred_key"])
     
     print("\n" + "="*60)
     print("✨ Data fetch complete!")
     print("="*60 + "\n")
 
-    os.environ["FRED_API_KEY"] = fred_key
-    engine = create_engine(db_url, pool_pre_ping=True)
-
-    # ===== Fetch Macro Series =====
-    print("\n📊 Fetching Macroeconomic Series...")
-    macro_data = {}
-    for label, fid in MACRO_SERIES.items():
-        try:
-            macro_data[label] = fetch_series(fid)
-            print(f"  ✓ {label}")
-        except Exception as e:
-            print(f"  ✗ Error fetching {label}: {e}")
-
-    macro_df = pd.concat(macro_data, axis=1)
-    macro_df = to_monthly(macro_df)
-    macro_df.reset_index(inplace=True)
-    macro_df.rename(columns={"index": "date"}, inplace=True)
-
-    # ===== Fetch Commodity Series =====
-    print("\n🔨 Fetching Commodity Series...")
-    commodity_data = {}
-    for label, info in COMMODITY_SERIES.items():
-        fid = info["fred_id"]
-        try:
-            commodity_data[label] = fetch_series(fid)
-            print(f"  ✓ {info['label']} ({label})")
-        except Exception as e:
-            print(f"  ✗ Error fetching {info['label']}: {e}")
-
-    if commodity_data:
-        commodity_df = pd.concat(commodity_data, axis=1)
-        commodity_df = to_monthly(commodity_df)
-        commodity_df.reset_index(inplace=True)
-        commodity_df.rename(columns={"index": "date"}, inplace=True)
-    else:
-        commodity_df = pd.DataFrame()
-
-    # ===== Write to Database =====
-    with engine.begin() as conn:
-        # Create/update macro table
-        macro_cols = ", ".join([f'"{c}" DOUBLE PRECISION' for c in MACRO_SERIES.keys()])
-        conn.execute(text(f"""
-            CREATE TABLE IF NOT EXISTS fred_all_series (
-                date DATE PRIMARY KEY,
-                {macro_cols}
-            );
-        """))
-        conn.execute(text("TRUNCATE fred_all_series;"))
-        macro_df.to_sql("fred_all_series", conn, if_exists="append", index=False)
-        print("\n✅ Macroeconomic data written to fred_all_series")
-
-        # Create/update commodity table
-        if not commodity_df.empty:
-            commodity_cols = ", ".join([f'"{c}" DOUBLE PRECISION' for c in commodity_data.keys()])
-            conn.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS fred_commodities (
-                    date DATE PRIMARY KEY,
-                    {commodity_cols}
-                );
-            """))
-            conn.execute(text("TRUNCATE fred_commodities;"))
-            commodity_df.to_sql("fred_commodities", conn, if_exists="append", index=False)
-            print("✅ Commodity data written to fred_commodities")
-        else:
-            print("⚠️  No commodity data to write")
-
 if __name__ == "__main__":
     main()
\ No newline at end of file